@@ -6,11 +6,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 from datetime import timedelta
 from sklearn.preprocessing import MinMaxScaler
+import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
+from tensorflow.keras.layers import Input, LSTM, Dense, Reshape
 import warnings
 
-plt.figure(figsize=(12,6))
 # Hiljennetään FutureWarning Kerasista
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -29,12 +29,45 @@ df = df.dropna(subset=["Energy_kWh"])
 if len(df) == 0:
     raise ValueError("CSV ei sisällä yhtään kelvollista datapistettä.")
 
-# Päivitä tasolle
-daily_data = df.groupby(pd.Grouper(key="Timestamp", freq="D"))["Energy_kWh"].mean().reset_index()
-daily_data.rename(columns={"Energy_kWh":"SpotPrice"}, inplace=True)
+# Päivän kulutus jaetaan tasan päivän vartteihin: CSV:ssä on vain yksi
+# lukema ajokertaa kohden, joten kulutuskanavassa ei ole päivänsisäistä vaihtelua
+df["Date"] = df["Timestamp"].dt.date
+daily_consumption = df.groupby("Date")["Energy_kWh"].sum().reset_index()
 
 # =================================================
-# 2) Hae Nord Pool spot-hintadataa sahkotin.fi API:sta
+# 2) Parametrit
+# =================================================
+SIIRTO_KWH = 0.05
+SAHKO_VERO = 0.028
+ALV = 0.255
+
+VARTIT_PV = 96                      # 15 min jaksoja vuorokaudessa
+sequence_length = 2 * VARTIT_PV     # syöteikkuna: 2 vrk
+horizon = VARTIT_PV                 # ennustetaan vuorokausi kerrallaan
+future_days = 30
+batch_size = 32
+shuffle_buffer = 1000
+epochs = 10
+
+TARGETS = ["Energy_kWh", "SpotPrice"]
+CALENDAR = ["Hour_sin", "Hour_cos", "Weekday_sin", "Weekday_cos"]
+
+
+def calendar_features(ts):
+    hour = ts.hour + ts.minute / 60
+    return np.column_stack([
+        np.sin(2 * np.pi * hour / 24),
+        np.cos(2 * np.pi * hour / 24),
+        np.sin(2 * np.pi * ts.weekday / 7),
+        np.cos(2 * np.pi * ts.weekday / 7),
+    ])
+
+
+def total_price(spot):
+    return (spot + SIIRTO_KWH + SAHKO_VERO) * (1 + ALV)
+
+# =================================================
+# 3) Hae Nord Pool spot-hintadataa sahkotin.fi API:sta (15 min)
 # =================================================
 start_date = (df["Timestamp"].min() - timedelta(days=1)).strftime("%Y-%m-%dT00:00:00.000Z")
 end_date   = (df["Timestamp"].max() + timedelta(days=1)).strftime("%Y-%m-%dT00:00:00.000Z")
@@ -46,117 +79,219 @@ try:
     data = resp.json().get("prices", [])
 
     price_df = pd.DataFrame(data)
-    price_df["date"] = pd.to_datetime(price_df["date"])
+    price_df["date"] = pd.to_datetime(price_df["date"]).dt.tz_convert("Europe/Helsinki").dt.tz_localize(None)
     price_df.rename(columns={"value":"Price_snt_per_kWh"}, inplace=True)
-    price_df["Price_EUR_per_kWh"] = price_df["Price_snt_per_kWh"] / 100  # sentit → eurot
-
-    # Päivätason keskiarvo
-    daily_api = price_df.groupby(price_df["date"].dt.floor("D"))["Price_EUR_per_kWh"].mean().reset_index()
-    daily_api.rename(columns={"date":"Timestamp","Price_EUR_per_kWh":"SpotPrice"}, inplace=True)
-
-    # =================================================
-    # 3) Muunna tz-naive molemmille
-    # =================================================
-    daily_data["Timestamp"] = pd.to_datetime(daily_data["Timestamp"]).dt.tz_localize(None)
-    daily_api["Timestamp"] = pd.to_datetime(daily_api["Timestamp"]).dt.tz_localize(None)
-
-    # Yhdistä CSV ja API
-    combined_data = pd.concat([daily_data, daily_api])
-    combined_data = combined_data.groupby("Timestamp").mean().reset_index()
-    combined_data.sort_values("Timestamp", inplace=True)
-
-    daily_data = combined_data
+    price_df["SpotPrice"] = price_df["Price_snt_per_kWh"] / 100  # sentit → eurot
+    price_df["Date"] = price_df["date"].dt.date
     print("Spot-hinta haettu onnistuneesti API:sta.")
 
 except Exception as e:
     print(f"Nykyhinnan haku epäonnistui: {e}")
-    print("Käytetään pelkkää CSV-historiaa LSTM:ään.")
+    print("Ennustetaan ilman hintahistoriaa.")
+    price_df = pd.DataFrame({
+        "date": pd.Series(dtype="datetime64[ns]"),
+        "SpotPrice": pd.Series(dtype=float),
+        "Date": pd.Series(dtype=object),
+    })
 
 # =================================================
-# 4) Tässä vaiheessa daily_data on valmis LSTM:ään
+# 4) Yhtenäinen 15 min ruudukko: kulutus, hinta ja kalenteri omina kanavinaan
+#    Kumpikin kanava säilyttää oman historiansa; puuttuvat vartit jäävät NaN:ksi
+#    eikä niitä käytetä opetusikkunoissa.
 # =================================================
-print(daily_data.head())
+spot_series = price_df.groupby("date")["SpotPrice"].mean()  # kesäajan tuplavartit yhdeksi
+kwh_by_date = daily_consumption.set_index("Date")["Energy_kWh"] / VARTIT_PV
 
+grid_start = min([pd.Timestamp(df["Timestamp"].min()).normalize()] + list(spot_series.index[:1]))
+grid_end = max([pd.Timestamp(df["Timestamp"].max()).normalize() + timedelta(days=1) - timedelta(minutes=15)] + list(spot_series.index[-1:]))
+grid = pd.date_range(grid_start, grid_end, freq="15min")
 
-# =================================================
-# 3) Parametrit ja skaalaus
-# =================================================
-sequence_length = 30
-future_days = 30
+quarter = pd.DataFrame({"Timestamp": grid})
+quarter["Energy_kWh"] = quarter["Timestamp"].dt.date.map(kwh_by_date).astype(float)
+quarter["SpotPrice"] = spot_series.reindex(grid).to_numpy()
+quarter[CALENDAR] = calendar_features(grid)
+
+print(quarter.head())
+
+# Ikkuna kelpaa, jos jokaisessa sen vartissa on sekä kulutus että hinta
+valid = quarter[TARGETS].notna().all(axis=1).to_numpy()
+invalid_before = np.concatenate([[0], np.cumsum(~valid)])
 
-scaler = MinMaxScaler(feature_range=(0, 1))
-scaled_data = scaler.fit_transform(daily_data["SpotPrice"].values.reshape(-1,1))
+
+def full_windows(length):
+    """Palauttaa niiden ikkunoiden alkuindeksit, joissa ei ole aukkoja."""
+    starts = np.arange(len(valid) - length + 1)
+    return starts[invalid_before[starts + length] - invalid_before[starts] == 0]
+
+
+train_starts = full_windows(sequence_length + horizon)
+has_price = spot_series.notna().any()
+
+# Ennusteen lähtöikkuna päättyy uusimman täyden päivän viimeiseen varttiin,
+# jotta ennuste alkaa seuraavasta keskiyöstä ja kattaa kokonaiset päivät.
+# Jos ikkunassa on aukkoja (esim. mittaus jäänyt väliin tai kesäajan vaihto),
+# vanhempaa ikkunaa ei käytetä vaan siirrytään staattiseen ennusteeseen.
+seed_start = None
+day_ends = np.flatnonzero(valid & (quarter["Timestamp"].dt.hour * 60 + quarter["Timestamp"].dt.minute == 23 * 60 + 45).to_numpy())
+if len(day_ends) > 0:
+    seed_end = day_ends[-1] + 1
+    candidate = seed_end - sequence_length
+    last_valid = np.flatnonzero(valid)[-1]
+    if last_valid - day_ends[-1] >= horizon:
+        print("Varoitus: uusin data ei sisällä täyttä päivää, LSTM-ennustetta ei tehdä.")
+    elif candidate >= 0 and invalid_before[seed_end] - invalid_before[candidate] == 0:
+        seed_start = candidate
+    else:
+        print("Varoitus: uusimmassa 2 vrk:n jaksossa on aukkoja, LSTM-ennustetta ei tehdä.")
 
 # =================================================
-# 4) LSTM-ennuste
+# 5) Skaalaus ja tf.data-putki
+#    Ikkunat leikataan putkessa laiskasti alkuindekseistä, joten muistissa
+#    on vain vartin perusdata eikä koko (ikkunat × pituus × kanavat) -tensoria.
 # =================================================
-if len(scaled_data) > sequence_length:
-    X, y = [], []
-    for i in range(sequence_length, len(scaled_data)):
-        X.append(scaled_data[i-sequence_length:i, 0])
-        y.append(scaled_data[i, 0])
+scaler = MinMaxScaler(feature_range=(0, 1))
+
+if len(train_starts) > 0 and seed_start is not None:
+    print("Käytetään monikanavaista LSTM:ää ennustukseen.")
+
+    # MinMaxScaler ohittaa NaN-arvot sovituksessa; aukot täytetään nollilla,
+    # mutta ne eivät koskaan päädy hyväksyttyihin ikkunoihin.
+    features = np.nan_to_num(np.hstack([
+        scaler.fit_transform(quarter[TARGETS].values),
+        quarter[CALENDAR].values,
+    ])).astype(np.float32)
+    n_features = features.shape[1]
+    features_t = tf.constant(features)
 
-    X = np.array(X)
-    y = np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    def make_window(start):
+        x = features_t[start:start + sequence_length]
+        y = features_t[start + sequence_length:start + sequence_length + horizon, :len(TARGETS)]
+        return x, y
 
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(train_starts)
+        .shuffle(shuffle_buffer)
+        .map(make_window, num_parallel_calls=tf.data.AUTOTUNE)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+    # =================================================
+    # LSTM-malli
+    # =================================================
     model = Sequential()
-    model.add(LSTM(50, return_sequences=True, input_shape=(X.shape[1],1)))
-    model.add(LSTM(50))
-    model.add(Dense(1))
+    model.add(Input(shape=(sequence_length, n_features)))
+    model.add(LSTM(64, return_sequences=True))
+    model.add(LSTM(64))
+    model.add(Dense(horizon * len(TARGETS)))
+    model.add(Reshape((horizon, len(TARGETS))))
     model.compile(optimizer="adam", loss="mean_squared_error")
-    model.fit(X, y, epochs=50, batch_size=16, verbose=0)
+    model.fit(dataset, epochs=epochs, verbose=0)
+
+    # =================================================
+    # Ennusta vuorokausi kerrallaan seuraavat 30 päivää
+    # uusimman täyden päivän jälkeisestä keskiyöstä alkaen
+    # =================================================
+    last_time = quarter["Timestamp"].iloc[seed_start + sequence_length - 1]
+    future_times = pd.date_range(last_time + timedelta(minutes=15), periods=future_days * horizon, freq="15min")
 
-    pred_inputs = scaled_data[-sequence_length:].reshape(1, sequence_length, 1)
+    pred_inputs = features[seed_start:seed_start + sequence_length]
     predictions = []
-    for _ in range(future_days):
-        pred = model.predict(pred_inputs, verbose=0)[0][0]
+    for day in range(future_days):
+        day_times = future_times[day * horizon:(day + 1) * horizon]
+        pred = model(pred_inputs[np.newaxis], training=False).numpy()[0]
         predictions.append(pred)
-        pred_inputs = np.append(pred_inputs[:,1:,:], [[[pred]]], axis=1)
+        next_rows = np.hstack([pred, calendar_features(day_times)]).astype(np.float32)
+        pred_inputs = np.vstack([pred_inputs[horizon:], next_rows])
+
+    predicted = scaler.inverse_transform(np.vstack(predictions))
+    predicted_kwh = np.clip(predicted[:, 0], 0, None)
+    predicted_spot = predicted[:, 1]
 
-    predicted_values = scaler.inverse_transform(np.array(predictions).reshape(-1,1)).flatten()
 else:
-    last_value = daily_data["SpotPrice"].iloc[-1]
-    predicted_values = [last_value] * future_days
+    # Staattinen ennuste: kulutus CSV-historiasta, hinta vain jos sitä on saatu
+    print("Liian vähän dataa LSTM:lle. Käytetään staattista ennustetta.")
+    last_time = pd.Timestamp(daily_consumption["Date"].iloc[-1]) + timedelta(days=1) - timedelta(minutes=15)
+    future_times = pd.date_range(last_time + timedelta(minutes=15), periods=future_days * horizon, freq="15min")
+
+    predicted_kwh = np.full(len(future_times), daily_consumption["Energy_kWh"].iloc[-1] / VARTIT_PV)
+    if has_price:
+        # Kullekin kellonajalle viimeisin tunnettu vartin hinta
+        known = spot_series.dropna()
+        last_by_time = known.groupby(known.index.time).last()
+        predicted_spot = pd.Series(future_times.time).map(last_by_time).to_numpy(dtype=float)
+    else:
+        print("Hintahistoriaa ei ole: ennustetaan vain kulutus, hinta ja kustannus jätetään tyhjiksi.")
+        predicted_spot = np.full(len(future_times), np.nan)
 
 # =================================================
-# 5) Laske todellinen hinta (siirto + verot)
+# 6) Laske todellinen hinta ja kustannus (siirto + verot)
 # =================================================
-SIIRTO_KWH = 0.05
-SAHKO_VERO = 0.028
-ALV = 0.255
+forecast = pd.DataFrame({
+    "Timestamp": future_times,
+    "Energy_kWh": predicted_kwh,
+    "SpotPrice": predicted_spot,
+})
+forecast["TotalPrice_EUR_per_kWh"] = total_price(forecast["SpotPrice"])
+forecast["Cost_EUR"] = forecast["Energy_kWh"] * forecast["TotalPrice_EUR_per_kWh"]
 
-total_price = (np.array(predicted_values) + SIIRTO_KWH + SAHKO_VERO) * (1+ALV)
+daily_forecast = forecast.groupby(forecast["Timestamp"].dt.floor("D")).agg(
+    Predicted_kWh=("Energy_kWh", "sum"),
+    SpotPrice=("SpotPrice", "mean"),
+    TotalPrice_EUR_per_kWh=("TotalPrice_EUR_per_kWh", "mean"),
+    Cost_EUR=("Cost_EUR", "sum"),
+).reset_index()
+if not has_price:
+    daily_forecast[["SpotPrice", "TotalPrice_EUR_per_kWh", "Cost_EUR"]] = np.nan
 
-last_date = daily_data["Timestamp"].max()
-future_dates = [last_date + timedelta(days=i+1) for i in range(future_days)]
+# Historia kanavittain: kulutus CSV:stä, hinta API:sta
+history_kwh = daily_consumption.assign(Timestamp=pd.to_datetime(daily_consumption["Date"]))
+history_price = spot_series.groupby(spot_series.index.floor("D")).mean()
 
 # =================================================
-# 6) Piirrä graafi
+# 7) Piirrä graafi
 # =================================================
-import matplotlib.pyplot as plt
-plt.figure(figsize=(12,6))
-plt.plot(daily_data["Timestamp"], daily_data["SpotPrice"], label="Historiallinen spot-hinta €/kWh", color="blue", marker="o")
-plt.plot(future_dates, predicted_values, label="AI-ennuste spot-hinta €/kWh", color="cyan", marker="x")
-plt.plot(future_dates, total_price, label="AI-ennuste todellinen hinta €/kWh", color="red", marker="s")
-plt.axvline(last_date, color="gray", linestyle="--", label="Nykyhetki")
-plt.xlabel("Päivä")
-plt.ylabel("Hinta €/kWh")
-plt.title("Spot-hinta ja ennuste seuraavalle kuukaudelle")
-plt.legend()
+fig, ax1 = plt.subplots(figsize=(12,6))
+
+ax1.set_xlabel("Päivä")
+ax1.set_ylabel("Hinta €/kWh", color="blue")
+if has_price:
+    ax1.plot(history_price.index, history_price.values, label="Historiallinen spot-hinta €/kWh", color="blue", marker="o")
+    ax1.plot(daily_forecast["Timestamp"], daily_forecast["SpotPrice"], label="AI-ennuste spot-hinta €/kWh", color="cyan", marker="x")
+    ax1.plot(daily_forecast["Timestamp"], daily_forecast["TotalPrice_EUR_per_kWh"], label="AI-ennuste todellinen hinta €/kWh", color="red", marker="s")
+ax1.tick_params(axis='y', labelcolor="blue")
+
+ax2 = ax1.twinx()
+ax2.set_ylabel("Kulutus kWh / kustannus €", color="green")
+ax2.plot(history_kwh["Timestamp"], history_kwh["Energy_kWh"], label="Historiallinen kulutus kWh", color="green", marker="o")
+ax2.plot(daily_forecast["Timestamp"], daily_forecast["Predicted_kWh"], label="AI-ennuste kulutus kWh", color="lime", marker="x")
+if has_price:
+    ax2.plot(daily_forecast["Timestamp"], daily_forecast["Cost_EUR"], label="AI-ennuste kustannus €", color="orange", marker="s")
+ax2.tick_params(axis='y', labelcolor="green")
+
+ax1.axvline(last_time, color="gray", linestyle="--", label="Nykyhetki")
+
+lines_1, labels_1 = ax1.get_legend_handles_labels()
+lines_2, labels_2 = ax2.get_legend_handles_labels()
+ax2.legend(lines_1 + lines_2, labels_1 + labels_2, loc="upper left")
+
+plt.title("Kulutus, spot-hinta ja kustannusennuste seuraavalle kuukaudelle")
 plt.grid(True)
 plt.tight_layout()
 plt.show()
 
 # =================================================
-# 7) Kirjoita CSV
+# 8) Kirjoita CSV (puuttuva hinta ja kustannus tyhjinä kenttinä)
 # =================================================
 output_csv = os.path.join(home_dir, "forecast_output.csv")
 with open(output_csv, "w", newline="", encoding="utf-8") as f:
     writer = csv.writer(f)
-    writer.writerow(["Date","Predicted_kWh","TotalPrice_EUR_per_kWh"])
-    for d, val, price in zip(future_dates, predicted_values, total_price):
-        writer.writerow([d,val,price])
+    writer.writerow(["Date","Predicted_kWh","TotalPrice_EUR_per_kWh","Cost_EUR"])
+    for row in daily_forecast.itertuples(index=False):
+        price = "" if pd.isna(row.TotalPrice_EUR_per_kWh) else row.TotalPrice_EUR_per_kWh
+        cost = "" if pd.isna(row.Cost_EUR) else row.Cost_EUR
+        writer.writerow([row.Timestamp, row.Predicted_kWh, price, cost])
 
 print(f"Ennuste CSV: {output_csv}")
-
+if has_price:
+    print(f"Ennustettu kuukausikustannus: {daily_forecast['Cost_EUR'].sum():.2f} €")
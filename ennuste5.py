@@ -0,0 +1,176 @@
+import os
+import csv
+import requests
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from datetime import timedelta
+
+# =================================================
+# 1) Polut ja parametrit
+# =================================================
+home_dir = os.path.expanduser("~")
+csv_file = os.path.join(home_dir, "battery_energy_summary.csv")
+output_csv = os.path.join(home_dir, "scenario_output.csv")
+monthly_csv = os.path.join(home_dir, "scenario_monthly.csv")
+
+SIIRTO_KWH = 0.05
+SAHKO_VERO = 0.028
+ALV = 0.255
+
+SKENAARIOT = 10_000          # hinta- ja kulutuspolkujen määrä
+PAIVAT = 30                  # ennustejakso päivinä
+VARTIT_PV = 96               # 15 min jaksoja vuorokaudessa
+BLOKIN_PITUUS_PV = 1         # bootstrap-blokin pituus päivinä
+MUISTIBUDJETTI_MT = 256      # yhden laskentaerän enimmäiskoko megatavuina
+SIEMEN = 42
+PERSENTIILIT = [10, 50, 90]
+
+n_slots = PAIVAT * VARTIT_PV
+
+# =================================================
+# 2) Lue kulutusdata CSV:stä
+# =================================================
+df = pd.read_csv(csv_file)
+df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+df["Energy_kWh"] = pd.to_numeric(df["TotalEnergy_kWh"], errors='coerce')
+df = df.dropna(subset=["Energy_kWh"])
+
+if len(df) == 0:
+    raise ValueError("CSV ei sisällä yhtään kelvollista datapistettä.")
+
+df["Date"] = df["Timestamp"].dt.date
+daily_consumption = df.groupby("Date")["Energy_kWh"].sum().reset_index()
+
+# =================================================
+# 3) Hae Nord Pool spot-hintadataa sahkotin.fi API:sta (15 min)
+# =================================================
+start_date = (df["Timestamp"].min() - timedelta(days=1)).strftime("%Y-%m-%dT00:00:00.000Z")
+end_date   = (df["Timestamp"].max() + timedelta(days=1)).strftime("%Y-%m-%dT00:00:00.000Z")
+
+url = f"https://sahkotin.fi/prices?quarter&fix&vat&start={start_date}&end={end_date}"
+resp = requests.get(url)
+resp.raise_for_status()
+data = resp.json().get("prices", [])
+
+price_df = pd.DataFrame(data)
+price_df["date"] = pd.to_datetime(price_df["date"]).dt.tz_convert("Europe/Helsinki").dt.tz_localize(None)
+price_df.rename(columns={"value":"Price_snt_per_kWh"}, inplace=True)
+price_df["Price_EUR_per_kWh"] = price_df["Price_snt_per_kWh"] / 100  # sentit → eurot
+price_df["Date"] = price_df["date"].dt.date
+
+# =================================================
+# 4) Vartin historia päivittäin: hinta ja kulutus rinnakkain
+#    Päivän kulutus jaetaan tasan päivän vartteihin. Mukaan otetaan vain
+#    päivät, joilta on sekä kulutus että täydet 96 vartin hinnat
+#    (kesäajan vaihtopäivät jäävät pois).
+# =================================================
+quarter = pd.merge(price_df, daily_consumption, on="Date", how="inner")
+quarter.sort_values("date", inplace=True)
+quarter["Energy_kWh"] = quarter["Energy_kWh"] / VARTIT_PV
+
+slots_per_day = quarter.groupby("Date")["date"].transform("size")
+quarter = quarter[slots_per_day == VARTIT_PV]
+
+if quarter.empty:
+    raise ValueError(
+        f"Liian vähän yhtenäistä päivähistoriaa bootstrapiin (blokki {BLOKIN_PITUUS_PV} pv)."
+    )
+
+hist_dates = pd.to_datetime(pd.Series(quarter["Date"].unique()))
+hist_price = quarter["Price_EUR_per_kWh"].to_numpy(dtype=np.float64).reshape(-1, VARTIT_PV)
+hist_kwh = quarter["Energy_kWh"].to_numpy(dtype=np.float64).reshape(-1, VARTIT_PV)
+
+# Blokin aloituspäiviksi kelpaavat vain päivät, joita seuraa
+# BLOKIN_PITUUS_PV peräkkäistä kalenteripäivää ilman aukkoja.
+day_number = ((hist_dates - hist_dates.iloc[0]).dt.days).to_numpy()
+n_hist_days = len(day_number)
+valid_starts = np.array([
+    i for i in range(n_hist_days - BLOKIN_PITUUS_PV + 1)
+    if day_number[i + BLOKIN_PITUUS_PV - 1] - day_number[i] == BLOKIN_PITUUS_PV - 1
+], dtype=np.int64)
+
+if len(valid_starts) == 0:
+    raise ValueError(
+        f"Liian vähän yhtenäistä päivähistoriaa bootstrapiin (blokki {BLOKIN_PITUUS_PV} pv)."
+    )
+
+# =================================================
+# 5) Skenaariot blokki-bootstrapilla erissä
+#    Hinta ja kulutus poimitaan samoista kokonaisista päivistä, jolloin
+#    niiden keskinäinen riippuvuus ja vuorokausirytmi säilyvät. Erän koko
+#    määräytyy muistibudjetista: jokaista polkua kohden pidetään muistissa
+#    hinta ja kulutus.
+# =================================================
+bytes_per_path = n_slots * 2 * np.dtype(np.float64).itemsize
+chunk_size = max(1, min(SKENAARIOT, (MUISTIBUDJETTI_MT * 1024 * 1024) // bytes_per_path))
+
+n_blocks = -(-PAIVAT // BLOKIN_PITUUS_PV)  # pyöristys ylöspäin
+offsets = np.arange(BLOKIN_PITUUS_PV)
+
+rng = np.random.default_rng(SIEMEN)
+daily_cost = np.empty((SKENAARIOT, PAIVAT))
+
+for first in range(0, SKENAARIOT, chunk_size):
+    n = min(chunk_size, SKENAARIOT - first)
+
+    starts = valid_starts[rng.integers(0, len(valid_starts), size=(n, n_blocks))]
+    day_idx = (starts[:, :, None] + offsets).reshape(n, -1)[:, :PAIVAT]
+
+    price = hist_price[day_idx]
+    kwh = hist_kwh[day_idx]
+
+    # Tariffikaava koko erälle yhdellä taulukko-operaatiolla
+    price += SIIRTO_KWH + SAHKO_VERO
+    price *= (1 + ALV)
+    price *= kwh
+
+    daily_cost[first:first + n] = price.sum(axis=2)
+
+print(f"Skenaarioita: {SKENAARIOT}, eräkoko: {chunk_size}")
+
+# =================================================
+# 6) Persentiilit: kuukausikustannus ja kertymä päivittäin
+# =================================================
+monthly_cost = daily_cost.sum(axis=1)
+p10, p50, p90 = np.percentile(monthly_cost, PERSENTIILIT)
+
+print(f"Kuukausikustannus P10: {p10:.2f} €")
+print(f"Kuukausikustannus P50: {p50:.2f} €")
+print(f"Kuukausikustannus P90: {p90:.2f} €")
+
+cumulative_bands = np.percentile(np.cumsum(daily_cost, axis=1), PERSENTIILIT, axis=0)
+
+last_date = pd.to_datetime(quarter["Date"].max())
+future_dates = [last_date + timedelta(days=i+1) for i in range(PAIVAT)]
+
+# =================================================
+# 7) Piirrä graafi
+# =================================================
+plt.figure(figsize=(12,6))
+plt.fill_between(future_dates, cumulative_bands[0], cumulative_bands[2], color="orange", alpha=0.3, label="P10–P90 kustannus €")
+plt.plot(future_dates, cumulative_bands[1], color="red", marker='s', label="P50 kustannus € (sis. siirto + verot)")
+plt.xlabel("Päivä")
+plt.ylabel("Kertynyt kustannus €")
+plt.title("Kustannusskenaariot seuraavalle kuukaudelle")
+plt.legend()
+plt.grid(True)
+plt.tight_layout()
+plt.show()
+
+# =================================================
+# 8) Kirjoita CSV: kertymä päivittäin ja kuukausikustannus erikseen
+# =================================================
+with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.writer(f)
+    writer.writerow(["Date", "CumCost_P10_EUR", "CumCost_P50_EUR", "CumCost_P90_EUR"])
+    for d, lo, mid, hi in zip(future_dates, *cumulative_bands):
+        writer.writerow([d, lo, mid, hi])
+
+with open(monthly_csv, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.writer(f)
+    writer.writerow(["StartDate", "EndDate", "MonthlyCost_P10_EUR", "MonthlyCost_P50_EUR", "MonthlyCost_P90_EUR"])
+    writer.writerow([future_dates[0], future_dates[-1], p10, p50, p90])
+
+print(f"Skenaario CSV: {output_csv}")
+print(f"Kuukausikustannus CSV: {monthly_csv}")
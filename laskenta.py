@@ -4,6 +4,8 @@ import matplotlib.dates as mdates
 from matplotlib.animation import FuncAnimation
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from collections import deque
+import math
 import csv
 import os
 
@@ -16,6 +18,14 @@ TASATTU_15MIN = (20+5) / 2880  # kiinteät siirron ja kulutuksen peruskuukausima
 SIIRTO_KWH = 0.05  # €/kWh, sähkön siirtomaksu
 UPDATE_INTERVAL_MS = 15 * 60 * 1000  # 15 min
 CSV_FILE = "porssisahko_lasku.csv"
+IKKUNAT = {"1h": 4, "24h": 96, "7pv": 672}  # liukuvat ikkunat 15 min jaksoina
+NÄYTTÖ_IKKUNA = IKKUNAT["7pv"]  # kuvaajassa pidettävät pisteet
+HÄLYTYS_IKKUNA = "24h"  # ikkuna, johon z-lukua verrataan
+HÄLYTYS_RAJA = 0.40     # €/kWh, loppuhinnan kiinteä hälytysraja
+HÄLYTYS_HYSTEREESI = 0.02  # €/kWh, hinnan on laskettava rajan alle tämän verran ennen uutta hälytystä
+HÄLYTYS_Z = 3.0         # poikkeama keskihajontoina
+HÄLYTYS_MIN_N = 4       # vähimmäismäärä havaintoja ennen z-hälytystä
+HÄLYTYS_STD_MIN = 1e-4  # €/kWh, hajonnan alaraja tasaisen ikkunan jälkeen
 FIXED_CONSUMPTION_KWH = float(input("Anna kWh kulutus:"))
 
 # Luo CSV otsikoineen, jos ei ole
@@ -29,11 +39,11 @@ if not os.path.exists(CSV_FILE):
         ])
         
 
-# Data-listat graafia varten
-timestamps = []
-spot_prices = []
-final_prices = []
-cost_kwh = []
+# Data-puskurit graafia varten, pituus rajattu näyttöikkunaan
+timestamps = deque(maxlen=NÄYTTÖ_IKKUNA)
+spot_prices = deque(maxlen=NÄYTTÖ_IKKUNA)
+final_prices = deque(maxlen=NÄYTTÖ_IKKUNA)
+cost_kwh = deque(maxlen=NÄYTTÖ_IKKUNA)
 
 def get_current_spot_price():
     url = "https://api.spot-hinta.fi/JustNow"
@@ -61,6 +71,112 @@ def calculate_final_price(spot):
     return subtotal * (1 + ALV)
 
 
+class RollingStats:
+    """Liukuva keskiarvo, varianssi ja min/max vakioajassa per päivitys."""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_q = deque()  # (indeksi, arvo), arvot kasvavat
+        self.max_q = deque()  # (indeksi, arvo), arvot laskevat
+        self.index = 0
+
+    def push(self, x):
+        if len(self.values) < self.size:
+            # Welfordin päivitys ikkunan täyttyessä
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            # Ikkuna täynnä: vanhin arvo korvataan uudella
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            self.m2 = max(self.m2, 0.0)
+
+        while self.min_q and self.min_q[-1][1] >= x:
+            self.min_q.pop()
+        self.min_q.append((self.index, x))
+        while self.max_q and self.max_q[-1][1] <= x:
+            self.max_q.pop()
+        self.max_q.append((self.index, x))
+
+        oldest = self.index - self.size
+        if self.min_q[0][0] <= oldest:
+            self.min_q.popleft()
+        if self.max_q[0][0] <= oldest:
+            self.max_q.popleft()
+        self.index += 1
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def variance(self):
+        n = len(self.values)
+        return self.m2 / (n - 1) if n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self):
+        return self.min_q[0][1]
+
+    @property
+    def max(self):
+        return self.max_q[0][1]
+
+
+def price_alert(dt, final, reason):
+    print(f"HÄLYTYS {dt} | Loppuhinta: {final:.5f} | {reason}")
+
+
+# Hälytyksen kuuntelijat: lisää listaan oma funktio(dt, final, reason),
+# esim. ilmoitus, GPIO-ohjaus tai lokitus
+HÄLYTYS_KUUNTELIJAT = [price_alert]
+
+
+def fire_alert(dt, final, reason, listeners):
+    for listener in listeners:
+        listener(dt, final, reason)
+
+
+# Rajahälytyksen tila: hälytetään vain, kun hinta ylittää rajan
+alert_state = {"above": False}
+
+
+def check_alert(dt, final, stats, listeners=HÄLYTYS_KUUNTELIJAT):
+    """Tarkistaa hintapiikin ennen kuin uusi arvo lisätään ikkunaan."""
+    reasons = []
+
+    if not alert_state["above"] and final > HÄLYTYS_RAJA:
+        alert_state["above"] = True
+        reasons.append(f"ylitti rajan {HÄLYTYS_RAJA:.2f} €/kWh")
+    elif alert_state["above"] and final < HÄLYTYS_RAJA - HÄLYTYS_HYSTEREESI:
+        alert_state["above"] = False
+
+    if stats.count >= HÄLYTYS_MIN_N:
+        z = (final - stats.mean) / max(stats.std, HÄLYTYS_STD_MIN)
+        if z > HÄLYTYS_Z:
+            reasons.append(f"z-luku {z:.1f} ({HÄLYTYS_IKKUNA})")
+
+    if reasons:
+        fire_alert(dt, final, ", ".join(reasons), listeners)
+
+
+# Liukuvat tilastot ja päivän kustannuskertymä
+rolling_stats = {name: RollingStats(size) for name, size in IKKUNAT.items()}
+daily_cost = {"date": None, "total": 0.0}
+
+
 # Luo kuvaaja
 fig, ax = plt.subplots()
 line_spot, = ax.plot([], [], label="Spot-hinta €/kWh", color="blue")
@@ -80,22 +196,35 @@ def update(frame):
         final = calculate_final_price(spot)
         cost = final * FIXED_CONSUMPTION_KWH
 
-        # Päivitä data listalle
+        # Hälytys ja liukuvat tilastot
+        check_alert(dt, final, rolling_stats[HÄLYTYS_IKKUNA])
+        for stats in rolling_stats.values():
+            stats.push(final)
+
+        if daily_cost["date"] != dt.date():
+            daily_cost["date"] = dt.date()
+            daily_cost["total"] = 0.0
+        daily_cost["total"] += cost
+
+        # Päivitä data puskuriin
         timestamps.append(dt)
         spot_prices.append(spot)
         final_prices.append(final)
         cost_kwh.append(cost)
 
         # Päivitä kuvaaja
-        line_spot.set_data(timestamps, spot_prices)
-        line_final.set_data(timestamps, final_prices)
-        line_kwh.set_data(timestamps, cost_kwh)
+        line_spot.set_data(list(timestamps), list(spot_prices))
+        line_final.set_data(list(timestamps), list(final_prices))
+        line_kwh.set_data(list(timestamps), list(cost_kwh))
         ax.relim()
         ax.autoscale_view()
         ax.xaxis.set_major_locator(mdates.AutoDateLocator())
 
         # Tulosta konsoliin
         print(f"{dt} | Spot: {spot:.5f} | Loppuhinta: {final:.5f} | syötetyn kulutuksen hinta: {cost:.2f} €")
+        for name, stats in rolling_stats.items():
+            print(f"  {name}: ka {stats.mean:.5f} | hajonta {stats.std:.5f} | min {stats.min:.5f} | max {stats.max:.5f}")
+        print(f"  Päivän kustannus: {daily_cost['total']:.2f} €")
 
         # Kirjoita CSV:ään
         with open(CSV_FILE, 'a', newline='', encoding='utf-8') as f: